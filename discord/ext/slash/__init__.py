@@ -48,6 +48,8 @@ Notes
   information is still available.
 * All descriptions are **required**.
 * You must grant the bot ``applications.commands`` permissions in the OAuth2 section of the developer dashboard.
+* If ``orjson`` is installed (``pip install discord-ext-slash[orjson]``),
+  it is used to serialize request payloads instead of ``json``.
 
 See the wiki_.
 
@@ -55,15 +57,23 @@ See the wiki_.
 '''
 from __future__ import annotations
 import sys
+import copy
+import json
+import hashlib
 from warnings import warn
 from enum import IntEnum
 from typing import Coroutine, Union, Optional, Mapping, Any, List
 from functools import partial
+from itertools import islice
 from inspect import signature
 import logging
 import asyncio
 import discord
 from discord.ext import commands
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 __all__ = [
     'SlashWarning',
@@ -148,17 +158,45 @@ class MessageFlags(IntEnum):
     HAS_THREAD = 1 << 5
     EPHEMERAL = 1 << 6
 
+# plain ints, so option types can be compared without enum conversion
+_OPT_USER = int(ApplicationCommandOptionType.USER)
+_OPT_CHANNEL = int(ApplicationCommandOptionType.CHANNEL)
+_OPT_ROLE = int(ApplicationCommandOptionType.ROLE)
+
+# option types whose values are IDs of Discord objects
+_OBJECT_OPT_TYPES = frozenset({_OPT_USER, _OPT_CHANNEL, _OPT_ROLE})
+
+# response types pending deprecation -> warning message
+_DEPR_MSGS = {
+    rtype: f'{rtype!r} will be deprecated soon, see: '
+    'https://github.com/discord/discord-api-docs/pull/2615'
+    for rtype in (
+        InteractionResponseType.Acknowledge,
+        InteractionResponseType.ChannelMessage,
+    )
+}
+
 class _Route(discord.http.Route):
     BASE = 'https://discord.com/api/v8'
 
-class _AsyncInit:
-    async def __new__(cls, *args, **kwargs):
-        inst = super().__new__(cls)
-        await inst.__init__(*args, **kwargs)
-        return inst
-
-    async def __init__(self):
-        pass
+_std_to_json = discord.utils.to_json
+
+def _orjson_to_json(obj):
+    try:
+        return orjson.dumps(obj).decode('utf-8')
+    except TypeError: # e.g. non-str keys, which orjson refuses
+        return _std_to_json(obj)
+
+async def _gather(*aws):
+    # like asyncio.gather, but if one fails the rest are cancelled
+    # instead of being left running with nothing awaiting them
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
 
 class PartialObject(discord.Object):
     """Subclasses of this have their .guild as a discord.Object,
@@ -180,7 +218,7 @@ class PartialMember(discord.Member, PartialObject):
 class PartialRole(discord.Role, PartialObject):
     pass
 
-class Context(discord.Object, _AsyncInit):
+class Context(discord.Object):
     """Object representing an interaction.
 
     Attributes
@@ -209,7 +247,9 @@ class Context(discord.Object, _AsyncInit):
         The bot.
     webhook: Optional[:class:`discord.Webhook`]
         Webhook used for sending followup messages.
-        None until interaction response has been sent
+        None until interaction response has been sent,
+        and only created when first accessed. Can be set
+        to use a different webhook.
     """
 
     id: int
@@ -220,185 +260,199 @@ class Context(discord.Object, _AsyncInit):
     options: Mapping[str, Any]
     me: Union[discord.Member, discord.Object]
     client: SlashBot
-    webhook: Optional[discord.Webhook]
 
-    async def __init__(self, client: SlashBot, cmd: Command, event: dict):
+    def __init__(self, client: SlashBot, cmd: Command, event: dict):
         self.client = client
         self.command = cmd
         self.id = int(event['id'])
+        self.token = event['token']
+        # these never change for the lifetime of the interaction
+        self._wh_base = f"/webhooks/{self.client.app_id}/{self.token}"
+        self._callback_path = f"/interactions/{self.id}/{self.token}/callback"
+        self._responded = False
+        self._webhook = None
+
+    @classmethod
+    async def create(cls, client: SlashBot, cmd: Command, event: dict):
+        """Create a context for an interaction event, resolving the
+        objects and options it refers to.
+
+        Subclasses that need to do asynchronous setup should override
+        this, awaiting ``super().create(...)`` to get the instance.
+        """
+        self = cls(client, cmd, event)
+        await self._async_setup(event)
+        return self
+
+    async def _async_setup(self, event):
+        # find the invoked (sub)command and check its options
+        # before any lookups start
+        found = self._walk_options(event['data'].get('options', []))
         if event.get('guild_id', None):
             self.guild = await self._try_get(
-                discord.Object(event['guild_id']), self.client.get_guild,
+                int(event['guild_id']), self.client.get_guild,
                 self.client.fetch_guild, 'guild')
         else:
             self.guild = None
-        self.channel = await self._try_get(
-            discord.Object(event['channel_id']), self.client.get_channel,
-            self.client.fetch_channel, 'channel')
         if event.get('member', None):
             author = PartialMember(
                 data=event['member'], guild=self.guild,
                 state=self.client._connection)
-            self.author = await self._try_get(
-                author, self._get_member,
-                self._fetch_member, 'author-member')
+            author = self._try_get(
+                author.id, self._get_member,
+                self._fetch_member, 'author-member', default=author)
         else:
-            self.author = None
-        self.token = event['token']
-        # construct options into function-friendly form
-        await self._kwargs_from_options(
-            event['data'].get('options', []),
-            event['data'].get('resolved', {
-                'members': {}, 'users': {},
-                'channels': {}, 'roles': {}
-            })
+            author = self._none()
+        # everything from here on only depends on the guild,
+        # so resolve it all concurrently
+        self.channel, self.author, _, self.me = await _gather(
+            self._try_get(
+                int(event['channel_id']), self.client.get_channel,
+                self.client.fetch_channel, 'channel'),
+            author,
+            # construct options into function-friendly form
+            self._kwargs_from_options(
+                found, event['data'].get('resolved', {})),
+            self._try_get(
+                self.client.user.id, self._get_member,
+                self._fetch_member, 'me-member')
         )
-        self.me = await self._try_get(
-            discord.Object(self.client.user.id), self._get_member,
-            self._fetch_member, 'me-member')
-        self.webhook = None
 
-    async def _kwargs_from_options(self, options, resolved):
-        self.cog = self.command.cog
-        kwargs = {}
+    @staticmethod
+    async def _none():
+        return None
+
+    def _walk_options(self, options):
+        # descend into the invoked subcommand, returning its
+        # (argument name, int option type, raw value) triples
+        found = []
         for opt in options:
             if 'value' in opt:
-                value = opt['value']
-                for k, v in self.command.options.items():
-                    if v.name == opt['name']:
-                        opt['name'] = k
-                        break
-                else:
-                    raise commands.CommandInvokeError(
-                        f'No such option: {opt["name"]!r}')
-                opttype = self.command.options[opt['name']].type
                 try:
-                    opttype = ApplicationCommandOptionType(opttype)
-                except ValueError:
-                    pass # just use the new int
-                if opttype in {
-                    ApplicationCommandOptionType.USER,
-                    ApplicationCommandOptionType.CHANNEL,
-                    ApplicationCommandOptionType.ROLE,
-                }:
-                    value = discord.Object(value)
-                if opttype == ApplicationCommandOptionType.USER:
-                    def resolve_member(member):
-                        member['user'] = resolved['users'][str(value.id)]
-                        return PartialMember(
-                            data=member, guild=self.guild,
-                            state=self.client._connection)
-                    def resolve_user(user):
-                        return discord.User(
-                            state=self.client._connection, data=user)
-                    value = await self._try_get(
-                        value, self._get_member, self._fetch_member, 'member',
-                        resolve_method=resolve_member, resolved=resolved)
-                    if type(value) is discord.Object:
-                        value = await self._try_get(
-                            value, None, None, 'user', fq=False,
-                            resolve_method=resolve_user, resolved=resolved)
-                elif opttype == ApplicationCommandOptionType.CHANNEL:
-                    def get_channel(oid):
-                        return self.guild.get_channel(oid)
-                    def resolve_channel(channel):
-                        # discord.py doesn't access this with a default,
-                        # but it seems like the resolved object doesn't
-                        # provide it either, so set it if not set.
-                        # Also can't use None here because position is
-                        # used as a sort key too.
-                        channel.setdefault('position', -1)
-                        ctype = channel['type']
-                        ctype, _ = discord.channel._channel_factory(ctype)
-                        if ctype is discord.TextChannel:
-                            ctype = PartialTextChannel
-                        elif ctype is discord.CategoryChannel:
-                            ctype = PartialCategoryChannel
-                        elif ctype is discord.VoiceChannel:
-                            ctype = PartialVoiceChannel
-                        return ctype(state=self.client._connection,
-                                     guild=self.guild, data=channel)
-                    value = await self._try_get(
-                        value, get_channel, self.client.fetch_channel, 'channel',
-                        resolve_method=resolve_channel, resolved=resolved)
-                elif opttype == ApplicationCommandOptionType.ROLE:
-                    def get_role(oid):
-                        return self.guild.get_role(oid)
-                    def resolve_role(role):
-                        # monkeypatch for discord.py
-                        role['permissions_new'] = role['permissions']
-                        return PartialRole(state=self.client._connection,
-                                           guild=self.guild, data=role)
-                    value = await self._try_get(
-                        value, get_role, None, 'role', fng=False,
-                        resolve_method=resolve_role, resolved=resolved)
-                kwargs[opt['name']] = value
+                    name, opttype = self.command._opt_by_api_name[opt['name']]
+                except KeyError:
+                    raise commands.CommandInvokeError(
+                        f'No such option: {opt["name"]!r}') from None
+                found.append((name, opttype, opt['value']))
             elif 'options' in opt:
                 self.command = self.command.slash[opt['name']]
-                await self._kwargs_from_options(opt['options'], resolved)
-                return
+                return self._walk_options(opt['options'])
         if isinstance(self.command, Group):
             self.command = self.command.slash[opt['name']]
-            await self._kwargs_from_options(opt.get('options', []), resolved)
-        elif isinstance(self.command, Command):
-            kwargs[self.command._ctx_arg] = self
-            self.options = kwargs
+            return self._walk_options(opt.get('options', []))
+        self.cog = self.command.cog
+        return found
+
+    async def _kwargs_from_options(self, found, resolved):
+        kwargs = {}
+        # (name, coroutine) pairs that are awaited all at once
+        pending = []
+        for name, opttype, value in found:
+            if opttype in _OBJECT_OPT_TYPES:
+                value = int(value)
+            if opttype == _OPT_USER:
+                pending.append((name, self._resolve_user_chain(
+                    value, resolved)))
+            elif opttype == _OPT_CHANNEL:
+                pending.append((name, self._try_get(
+                    value, self._get_channel, self.client.fetch_channel,
+                    'channel', resolve_method=self._resolve_channel,
+                    resolved_bucket=resolved.get('channels', {}))))
+            elif opttype == _OPT_ROLE:
+                pending.append((name, self._try_get(
+                    value, self._get_role, None, 'role', fng=False,
+                    resolve_method=self._resolve_role,
+                    resolved_bucket=resolved.get('roles', {}))))
+            else:
+                kwargs[name] = value
+        if pending:
+            values = await _gather(*(coro for _, coro in pending))
+            for (name, _), value in zip(pending, values):
+                kwargs[name] = value
+        kwargs[self.command._ctx_arg] = self
+        self.options = kwargs
+
+    async def _resolve_user_chain(self, uid, resolved):
+        users = resolved.get('users', {})
+        obj = await self._try_get(
+            uid, self._get_member, self._fetch_member, 'member',
+            resolve_method=self._resolve_member, resolve_args=(users, uid),
+            resolved_bucket=resolved.get('members', {}))
+        if type(obj) is discord.Object:
+            # not a member of this guild, so settle for the user
+            obj = await self._try_get(
+                uid, None, None, 'user', fq=False,
+                resolve_method=self._resolve_user, resolved_bucket=users)
+        return obj
 
     async def _try_get(
-        self, default, get_method, fetch_method, typename, *,
-        resolve_method=None, resolved=None, fng=None, fq=None
+        self, default_id, get_method, fetch_method, typename, *,
+        default=None, resolve_method=None, resolve_args=(),
+        resolved_bucket=None, fng=None, fq=None
     ):
+        # default: returned when all else fails,
+        # or a plain discord.Object if not specified
         fq = (not self.client.resolve_not_fetch) if fq is None else fq
         fng = self.client.fetch_if_not_get if fng is None else fng
+        data = None
+        if resolved_bucket is not None:
+            data = resolved_bucket.get(str(default_id), None)
+        if data is not None and not fq:
+            # resolved data costs nothing, so don't bother getting
+            logger.debug(
+                'Resolved %s %s for interaction %s',
+                typename, default_id, self.id)
+            return resolve_method(data, *resolve_args)
         # always try to get *something*
-        if fq or resolved is None \
-                or str(default.id) not in resolved[typename+'s']:
+        obj = None
+        if get_method is not None:
             try:
-                obj = get_method(default.id)
-                if obj is None and fng:
-                    logger.debug(
-                        'Getting %s %s for interaction %s failed, '
-                        'falling back to fetching',
-                        typename, default.id, self.id)
-                    obj = await fetch_method(default.id)
-                elif not fng:
-                    raise ValueError
-                else:
-                    logger.debug(
-                        'Got %s %s for interaction %s',
-                        typename, obj.id, self.id)
-                    return obj
-            except discord.HTTPException:
+                obj = get_method(default_id)
+            except AttributeError: # e.g. the guild is only an Object
+                pass
+        if obj is not None:
+            logger.debug(
+                'Got %s %s for interaction %s',
+                typename, obj.id, self.id)
+            return obj
+        if fng and fetch_method is not None:
+            logger.debug(
+                'Getting %s %s for interaction %s failed, '
+                'falling back to fetching',
+                typename, default_id, self.id)
+            try:
+                obj = await fetch_method(default_id)
+            except (AttributeError, discord.HTTPException):
                 logger.debug(
                     'Fetching %s %s for interaction %s failed%s',
-                    typename, default.id, self.id,
-                    ', falling back to resolving'
-                    if resolved
-                    else ', falling back on default')
-            except (AttributeError, ValueError):
-                logger.debug(
-                    'Getting %s %s for interaction %s failed%s',
-                    typename, default.id, self.id,
+                    typename, default_id, self.id,
                     ', falling back to resolving'
-                    if resolved
+                    if resolved_bucket
                     else ', falling back on default')
             else:
                 logger.debug(
                     'Fetched %s %s for interaction %s',
                     typename, obj.id, self.id)
                 return obj
-        if resolved is None:
-            return default
-        obj = resolved[typename+'s'].get(str(default.id), None)
-        if obj is None:
+        else:
             logger.debug(
-                'Resolving %s %s for interaction %s failed',
-                typename, default.id, self.id)
+                'Getting %s %s for interaction %s failed%s',
+                typename, default_id, self.id,
+                ', falling back to resolving'
+                if resolved_bucket
+                else ', falling back on default')
+        if data is None:
+            if resolved_bucket is not None:
+                logger.debug(
+                    'Resolving %s %s for interaction %s failed',
+                    typename, default_id, self.id)
+            if default is None:
+                default = discord.Object(default_id)
             return default
         logger.debug(
             'Resolved %s %s for interaction %s',
-            typename, default.id, self.id)
-        return resolve_method(obj)
+            typename, default_id, self.id)
+        return resolve_method(data, *resolve_args)
 
     def _get_member(self, mid):
         return self.guild.get_member(mid)
@@ -406,9 +460,62 @@ class Context(discord.Object, _AsyncInit):
     async def _fetch_member(self, mid):
         return await self.guild.fetch_member(mid)
 
+    def _resolve_member(self, member, users, mid):
+        member['user'] = users[str(mid)]
+        return PartialMember(
+            data=member, guild=self.guild,
+            state=self.client._connection)
+
+    def _resolve_user(self, user):
+        return discord.User(
+            state=self.client._connection, data=user)
+
+    def _get_channel(self, cid):
+        return self.guild.get_channel(cid)
+
+    def _resolve_channel(self, channel):
+        # discord.py doesn't access this with a default,
+        # but it seems like the resolved object doesn't
+        # provide it either, so set it if not set.
+        # Also can't use None here because position is
+        # used as a sort key too.
+        channel.setdefault('position', -1)
+        ctype = channel['type']
+        ctype, _ = discord.channel._channel_factory(ctype)
+        if ctype is discord.TextChannel:
+            ctype = PartialTextChannel
+        elif ctype is discord.CategoryChannel:
+            ctype = PartialCategoryChannel
+        elif ctype is discord.VoiceChannel:
+            ctype = PartialVoiceChannel
+        return ctype(state=self.client._connection,
+                     guild=self.guild, data=channel)
+
+    def _get_role(self, rid):
+        return self.guild.get_role(rid)
+
+    def _resolve_role(self, role):
+        # monkeypatch for discord.py
+        role['permissions_new'] = role['permissions']
+        return PartialRole(state=self.client._connection,
+                           guild=self.guild, data=role)
+
     def __repr__(self):
         return f'<Interaction id={self.id}>'
 
+    @property
+    def webhook(self) -> Optional[discord.Webhook]:
+        # most interactions never follow up, so only build this on demand
+        if self._webhook is None and self._responded:
+            self._webhook = discord.Webhook.partial(
+                id=self.client.app_id, token=self.token, adapter=
+                discord.AsyncWebhookAdapter(self.client.http._HTTPClient__session))
+        return self._webhook
+
+    @webhook.setter
+    def webhook(self, value: Optional[discord.Webhook]):
+        self._webhook = value
+
     async def respond(
         self, content='', *, embed=None, embeds=None, allowed_mentions=None,
         flags=None, rtype=InteractionResponseType.ChannelMessageWithSource
@@ -430,35 +537,31 @@ class Context(discord.Object, _AsyncInit):
         rtype: :class:`InteractionResponseType`
             The type of response to send. See that class's documentation.
         """
-        if rtype in {
-            InteractionResponseType.Acknowledge,
-            InteractionResponseType.ChannelMessage,
-        }:
-            warn(f'{rtype!r} will be deprecated soon, see: '
-                 'https://github.com/discord/discord-api-docs/pull/2615',
-                 PendingDeprecationWarning)
+        if rtype in _DEPR_MSGS:
+            warn(_DEPR_MSGS[rtype], PendingDeprecationWarning)
         content = str(content)
         if embed and embeds:
             raise TypeError('Cannot specify both embed and embeds')
         if embed:
             embeds = [embed]
         if embeds:
-            embeds = [emb.to_dict() for emb, _ in zip(embeds, range(10))]
+            embeds = [emb.to_dict() for emb in islice(embeds, 10)]
         mentions = self.client.allowed_mentions
         if mentions is not None and allowed_mentions is not None:
             mentions = mentions.merge(allowed_mentions)
         elif allowed_mentions is not None:
             mentions = allowed_mentions
-        if self.webhook is not None:
+        if mentions is not None:
+            mentions = mentions.to_dict()
+        if self._responded:
             data = {}
             if content:
                 data['content'] = content
             if embeds:
                 data['embeds'] = embeds
             if mentions is not None:
-                data['allowed_mentions'] = mentions.to_dict()
-            path = f"/webhooks/{self.client.app_info.id}/{self.token}" \
-                "/messages/@original"
+                data['allowed_mentions'] = mentions
+            path = self._wh_base + "/messages/@original"
             route = _Route('PATCH', path, channel_id=self.channel.id,
                            guild_id=self.guild.id)
         else:
@@ -472,21 +575,17 @@ class Context(discord.Object, _AsyncInit):
             if embeds:
                 data['data']['embeds'] = embeds
             if mentions is not None:
-                data['data']['allowed_mentions'] = mentions.to_dict()
+                data['data']['allowed_mentions'] = mentions
             if flags:
                 data.setdefault('data', {})['flags'] = int(flags)
-            path = f"/interactions/{self.id}/{self.token}/callback"
-            route = _Route('POST', path, channel_id=self.channel.id,
-                           guild_id=self.guild.id)
-            self.webhook = discord.Webhook.partial(
-                id=self.client.app_info.id, token=self.token, adapter=
-                discord.AsyncWebhookAdapter(self.client.http._HTTPClient__session))
+            route = _Route('POST', self._callback_path,
+                           channel_id=self.channel.id, guild_id=self.guild.id)
         await self.client.http.request(route, json=data)
+        self._responded = True
 
     async def delete(self):
         """Delete the original interaction response message."""
-        path = f"/webhooks/{self.client.app_info.id}/{self.token}" \
-            "/messages/@original"
+        path = self._wh_base + "/messages/@original"
         route = _Route('DELETE', path, channel_id=self.channel.id,
                        guild_id=self.guild.id)
         await self.client.http.request(route)
@@ -524,10 +623,12 @@ class Option:
         Dicts are passed as kwargs to the Choice constructor.
     """
     description: str
-    type: ApplicationCommandOptionType = ApplicationCommandOptionType.STRING
-    name: Optional[str] = None
-    required: Optional[bool] = False
-    choices: Optional[List[Choice]] = None
+    type: ApplicationCommandOptionType
+    name: Optional[str]
+    required: Optional[bool]
+    choices: Optional[List[Choice]]
+
+    __slots__ = ('description', 'type', 'name', 'required', 'choices')
 
     def __init__(self, description: str,
                  type=ApplicationCommandOptionType.STRING, **kwargs):
@@ -559,7 +660,12 @@ class Option:
         return data
 
     def clone(self):
-        return type(self)(**self.to_dict())
+        # shallow copy instead of round-tripping through to_dict()
+        # and __init__; it also keeps any extra state of subclasses
+        new = copy.copy(self)
+        if self.choices is not None:
+            new.choices = list(self.choices)
+        return new
 
 class Choice:
     """Represents one choice for an option value.
@@ -574,6 +680,8 @@ class Choice:
     name: str
     value: str
 
+    __slots__ = ('name', 'value')
+
     def __init__(self, name: str, value: str):
         self.name = name
         self.value = value
@@ -592,6 +700,13 @@ class Choice:
     def to_dict(self):
         return {'name': self.name, 'value': self.value}
 
+# compiled string annotations, by (module name, annotation)
+_CODE_CACHE = {}
+
+async def _no_check(*args, **kwargs):
+    # default check; always passes, so can_run skips it
+    pass
+
 class Command(discord.Object):
     """Represents a slash command.
 
@@ -617,7 +732,6 @@ class Command(discord.Object):
         If ``True``, invoking the base parent of this command translates
         into invoking this subcommand. (Not settable in arguments.)
     """
-    cog = None
     coro: Coroutine
     id: Optional[int]
     name: str
@@ -626,6 +740,10 @@ class Command(discord.Object):
     parent: Optional[Group]
     options: Mapping[str, Option]
     default: bool = False
+    _cog = None
+    # parent checks and callbacks, built on first use
+    _parent_checks: Optional[list] = None
+    _parent_coros: Optional[list] = None
 
     def __init__(self, coro: Coroutine, **kwargs):
         self.id = None
@@ -636,16 +754,35 @@ class Command(discord.Object):
         self.guild_id = kwargs.pop('guild', None)
         if self.guild_id is not None:
             self.guild_id = int(self.guild_id)
-        self.parent = kwargs.pop('parent', None)
-        self._ctx_arg = None
-        self.options = {}
+        self._parent = kwargs.pop('parent', None)
+        # _ctx_cls is the evaluated annotation, even if it was a string
+        self.options, self._ctx_arg, self._ctx_cls = \
+            self._parse_signature(coro)
+        # API option name -> (argument name, int option type);
+        # the schema is fixed, so decoding an option is one lookup
+        self._opt_by_api_name = {
+            opt.name: (name, int(opt.type))
+            for name, opt in self.options.items()}
+        self._coro = coro
+        self._check = kwargs.pop('check', _no_check)
+
+    def _parse_signature(self, coro):
+        ctx_arg = ctx_cls = None
+        options = {}
+        globs = None
         for param in signature(coro).parameters.values():
             typ = param.annotation
             if isinstance(typ, str):
                 try:
                     # evaluate the annotation in its module's context
-                    globs = sys.modules[coro.__module__].__dict__
-                    typ = eval(typ, globs)
+                    if globs is None:
+                        globs = sys.modules[coro.__module__].__dict__
+                    key = (coro.__module__, typ)
+                    code = _CODE_CACHE.get(key, None)
+                    if code is None:
+                        code = _CODE_CACHE[key] = compile(
+                            typ, f'<annotation in {coro.__module__}>', 'eval')
+                    typ = eval(code, globs)
                 except:
                     typ = param.empty
             if (
@@ -658,22 +795,48 @@ class Command(discord.Object):
                                 'required argument with no valid annotation')
             try:
                 if issubclass(typ, Context):
-                    self._ctx_arg = param.name
+                    ctx_arg = param.name
+                    ctx_cls = typ
             except TypeError: # not even a class
                 pass
             if isinstance(typ, Option):
                 typ = typ.clone()
                 if param.default is param.empty:
                     typ.required = True
-                self.options[param.name] = typ
+                options[param.name] = typ
                 if typ.name is None:
                     typ.name = param.name
-        if self._ctx_arg is None:
+        if ctx_arg is None:
             raise ValueError('One argument must be type-hinted slash.Context')
-        self.coro = coro
-        async def check(*args, **kwargs):
-            pass
-        self._check = kwargs.pop('check', check)
+        return options, ctx_arg, ctx_cls
+
+    # the cached parent chain is built from these, so setting one clears it
+    @property
+    def coro(self) -> Coroutine:
+        return self._coro
+
+    @coro.setter
+    def coro(self, value: Coroutine):
+        self._coro = value
+        self._clear_parent_chain()
+
+    @property
+    def cog(self):
+        return self._cog
+
+    @cog.setter
+    def cog(self, value):
+        self._cog = value
+        self._clear_parent_chain()
+
+    @property
+    def parent(self) -> Optional[Group]:
+        return self._parent
+
+    @parent.setter
+    def parent(self, value: Optional[Group]):
+        self._parent = value
+        self._clear_parent_chain()
 
     @property
     def qualname(self):
@@ -688,6 +851,34 @@ class Command(discord.Object):
     def __hash__(self):
         return hash((self.name, self.guild_id))
 
+    def _clear_parent_chain(self):
+        self._parent_checks = None
+        self._parent_coros = None
+
+    def _build_parent_chain(self):
+        checks = []  # highest level parent last
+        cogs = []
+        coros = []
+        parent = self.parent
+        while parent is not None:
+            if parent.cog is not None:
+                if hasattr(parent.cog, 'cog_check'):
+                    if parent.cog.cog_check not in cogs:
+                        cogs.append(parent.cog.cog_check)
+                if parent._check is not _no_check:
+                    checks.append(partial(parent._check, parent.cog))
+                coros.append(partial(parent.coro, parent.cog))
+            else:
+                if parent._check is not _no_check:
+                    checks.append(parent._check)
+                coros.append(parent.coro)
+            parent = parent.parent
+        checks.extend(cogs)
+        checks.reverse()  # highest level parent first
+        coros.reverse()
+        self._parent_checks = checks
+        self._parent_coros = coros
+
     def to_dict(self):
         data = {
             'name': self.name,
@@ -700,6 +891,15 @@ class Command(discord.Object):
             data['default'] = self.default
         return data
 
+    def digest(self) -> bytes:
+        """A short hash of :meth:`to_dict`, for cheaply telling whether
+        the API definition of this command has changed.
+        """
+        # always stdlib json, so the digest doesn't depend on orjson
+        data = json.dumps(self.to_dict(), sort_keys=True,
+                          separators=(',', ':'))
+        return hashlib.blake2b(data.encode('utf-8'), digest_size=16).digest()
+
     async def invoke(self, ctx):
         if not await self.can_run(ctx):
             raise commands.CheckFailure(
@@ -718,40 +918,23 @@ class Command(discord.Object):
         Can be used as a decorator.
         """
         self._check = coro
+        self._clear_parent_chain()
 
     async def can_run(self, ctx):
-        parents = []  # highest level parent last
-        cogs = []
-        parent = self.parent
-        while parent is not None:
-            if parent.cog is not None:
-                if hasattr(parent.cog, 'cog_check'):
-                    if parent.cog.cog_check not in cogs:
-                        cogs.append(parent.cog.cog_check)
-                parents.append(partial(parent._check, parent.cog))
-            else:
-                parents.append(parent._check)
-            parent = parent.parent
-        parents.extend(cogs)
-        parents.extend(ctx.client._checks)
-        parents.reverse()  # highest level parent first
-        parents.append(self._check)
-        for check in parents:
+        if self._parent_checks is None:
+            self._build_parent_chain()
+        # client checks first, then highest level parent first
+        for check in (*reversed(ctx.client._checks), *self._parent_checks):
             if await check(ctx) is False:
                 return False
-        return True
+        if self._check is _no_check:
+            return True
+        return await self._check(ctx) is not False
 
     async def invoke_parents(self, ctx):
-        parents = []
-        parent = self.parent
-        while parent is not None:
-            if parent.cog is not None:
-                parents.append(partial(parent.coro, parent.cog))
-            else:
-                parents.append(parent.coro)
-            parent = parent.parent
-        parents.reverse()
-        for coro in parents:
+        if self._parent_coros is None:
+            self._build_parent_chain()
+        for coro in self._parent_coros:
             await coro(ctx)
 
 class Group(Command):
@@ -766,13 +949,18 @@ class Group(Command):
     slash: Mapping[:class:`str`, Union[:class:`Group`, :class:`Command`]]
         Subcommands of this group.
     """
-    cog = None
     slash: Mapping[str, Union[Group, Command]]
 
     def __init__(self, coro: Coroutine, **kwargs):
         super().__init__(coro, **kwargs)
         self.slash = {}
 
+    def _clear_parent_chain(self):
+        super()._clear_parent_chain()
+        # subcommands' chains include this group
+        for sub in getattr(self, 'slash', {}).values():
+            sub._clear_parent_chain()
+
     def slash_cmd(self, **kwargs):
         """See :class:`Command` doc"""
         kwargs['parent'] = self
@@ -852,7 +1040,11 @@ logger = logging.getLogger('discord.ext.slash')
 logger.setLevel(logging.INFO)
 
 class SlashBot(commands.Bot):
-    """A bot that supports slash commands."""
+    """A bot that supports slash commands.
+
+    Can be used as an asynchronous context manager, which closes the bot
+    (and with it, the HTTP session shared by all interactions) on exit.
+    """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -860,9 +1052,21 @@ class SlashBot(commands.Bot):
         self.resolve_not_fetch = bool(kwargs.pop('resolve_not_fetch', True))
         self.fetch_if_not_get = bool(kwargs.pop('fetch_if_not_get', False))
         self.slash = set()
+        self.app_id = None
+        self.app_info = None
+        # lookup tables for dispatching interactions
+        self._slash_by_id = {}
+        self._slash_by_name = {}
+        if orjson is not None:
+            # discord.py serializes every request body with this
+            discord.utils.to_json = _orjson_to_json
+        # on_ready fires again on reconnects; only register once
+        self._slash_registered = False
         @self.listen()
         async def on_ready():
-            self.remove_listener(on_ready)
+            if self._slash_registered:
+                return
+            self._slash_registered = True
             # only start listening to interaction-create once ready
             self._connection.parsers.setdefault('INTERACTION_CREATE', lambda data: (
                 self._connection.dispatch('interaction_create', data)))
@@ -878,6 +1082,7 @@ class SlashBot(commands.Bot):
         def decorator(func):
             cmd = Command(func, **kwargs)
             self.slash.add(cmd)
+            self._index_slash(cmd)
             return cmd
         return decorator
 
@@ -890,6 +1095,7 @@ class SlashBot(commands.Bot):
         def decorator(func):
             group = Group(func, **kwargs)
             self.slash.add(group)
+            self._index_slash(group)
             return group
         return decorator
 
@@ -901,12 +1107,33 @@ class SlashBot(commands.Bot):
         """Add all attributes of ``cog`` that are
         :class:`Command` or :class:`Group` instances.
         """
-        for key in dir(cog):
-            obj = getattr(cog, key)
-            if isinstance(obj, (Group, Command)):
-                obj.cog = cog
-                if obj.parent is None:
-                    self.slash.add(obj)
+        # only the namespaces commands can live in, instead of
+        # getattr()ing everything in dir(cog); the instance and the
+        # most derived class shadow the same name further down the MRO
+        seen = set()
+        for namespace in (vars(cog), *map(vars, type(cog).__mro__)):
+            for key, obj in namespace.items():
+                if key in seen:
+                    continue
+                seen.add(key)
+                if isinstance(obj, Command):
+                    obj.cog = cog
+                    if obj.parent is None:
+                        self.slash.add(obj)
+                        self._index_slash(obj)
+
+    def _index_slash(self, cmd):
+        self._slash_by_name[cmd.guild_id, cmd.name] = cmd
+        # bare name, for the name-only fallback
+        self._slash_by_name.setdefault(cmd.name, cmd)
+        if cmd.id is not None:
+            self._slash_by_id[cmd.id] = cmd
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
 
     async def application_info(self):
         self.app_info = await super().application_info()
@@ -918,23 +1145,23 @@ class SlashBot(commands.Bot):
                 f'Interaction data version {event["version"]} is not supported'
                 ', please open an issue for this: '
                 'https://github.com/Kenny2github/discord-ext-slash/issues/new')
-        cmd = discord.utils.get(self.slash, id=int(event['data']['id']))
+        guild_id = int(event['guild_id']) if event.get('guild_id') else None
+        cmd = self._slash_by_id.get(int(event['data']['id']), None)
         if cmd is None:
             warn(f'No command {event["data"]["name"]!r} found '
                  f'by ID {event["data"]["id"]}, falling back to '
                  'name + guild search', SlashWarning)
-            cmd = discord.utils.get(
-                self.slash, name=event['data']['name'], guild_id=event['guild_id'])
+            cmd = self._slash_by_name.get(
+                (guild_id, event['data']['name']), None)
         if cmd is None:
             warn(f'No command {event["data"]["name"]!r} found '
-                 f'by name and guild ID {event["guild_id"]}, '
+                 f'by name and guild ID {guild_id}, '
                  'falling back to name-only search', SlashWarning)
-            cmd = discord.utils.get(
-                self.slash, name=event['data']['name'])
+            cmd = self._slash_by_name.get(event['data']['name'], None)
         if cmd is None:
             raise commands.CommandNotFound(
                 f'No command {event["data"]["name"]!r} found by any critera')
-        ctx = await cmd.coro.__annotations__[cmd._ctx_arg](self, cmd, event)
+        ctx = await cmd._ctx_cls.create(self, cmd, event)
         try:
             await ctx.command.invoke(ctx)
         except commands.CommandError as exc:
@@ -942,85 +1169,65 @@ class SlashBot(commands.Bot):
         except asyncio.CancelledError:
             return
         except Exception as exc:
-            try:
-                raise commands.CommandInvokeError(exc) from exc
-            except commands.CommandInvokeError as exc2:
-                self.dispatch('command_error', ctx, exc2)
+            # equivalent to raise ... from exc, without the round trip
+            exc2 = commands.CommandInvokeError(exc)
+            exc2.__cause__ = exc
+            self.dispatch('command_error', ctx, exc2)
 
     async def register_commands(self):
-        app_info = await self.application_info()
-        global_path = f"/applications/{app_info.id}/commands"
-        guild_path = f"/applications/{app_info.id}/guilds/{{0}}/commands"
+        if self.user is not None:
+            # a bot's application ID is its user ID, so registering
+            # doesn't need to wait for application_info() - it is only
+            # fetched alongside, for app_info
+            self.app_id = self.user.id
+            app_info = asyncio.ensure_future(self.application_info())
+        else:
+            self.app_id = (await self.application_info()).id
+            app_info = None
+        global_path = f"/applications/{self.app_id}/commands"
+        guild_path = f"/applications/{self.app_id}/guilds/{{0}}/commands"
         guilds = {}
+        # guild IDs may change here, so index names again
+        self._slash_by_name.clear()
         for cmd in self.slash:
             cmd.guild_id = cmd.guild_id or self.debug_guild
             guilds.setdefault(cmd.guild_id, {})[cmd.name] = cmd
-        state = {
-            'POST': {},
-            'PATCH': {},
-            'DELETE': {}
-        }
-        route = _Route('GET', global_path)
-        if None in guilds:
-            global_cmds = await self.http.request(route)
-            await self.sync_cmds(state, guilds[None], global_cmds, None)
-        for guild_id, guild in guilds.items():
-            if guild_id is None:
-                continue
-            route = _Route('GET', guild_path.format(guild_id))
-            guild_cmds = await self.http.request(route)
-            await self.sync_cmds(state, guild, guild_cmds, guild_id)
-        del guilds
-        for method, guilds in state.items():
-            for guild_id, guild in guilds.items():
-                for name, kwargs in guild.items():
-                    if guild_id is None:
-                        path = global_path
-                    else:
-                        path = guild_path.format(guild_id)
-                    if 'id' in kwargs:
-                        path += f'/{kwargs.pop("id")}'
-                    route = _Route(method, path)
-                    asyncio.create_task(self.process_command(
-                        name, guild_id, route, kwargs))
-
-    async def sync_cmds(self, state, todo, done, guild_id):
-        # todo - registered in code
-        # done - registered on API
-        done = {data['name']: data for data in done}
-        # in the API but not in code
-        to_delete = set(done.keys()) - set(todo.keys())
-        # in both, filtering done later to see which ones to update
-        to_update = set(done.keys()) & set(todo.keys())
-        # in code but not in API
-        to_create = set(todo.keys()) - set(done.keys())
-        for name in to_create:
-            state['POST'].setdefault(guild_id, {})[name] \
-                = {'json': todo[name].to_dict(), 'cmd': todo[name]}
-        for name in to_update:
-            cmd_dict = todo[name].to_dict()
-            up_to_date = all(done[name].get(k, ...) == cmd_dict.get(k, ...)
-                             for k in {'name', 'description', 'options'})
-            if up_to_date:
-                logger.debug('GET\t%s\tin guild\t%s', name, guild_id)
-                todo[name].id = int(done[name]['id'])
-            else:
-                cmd_dict.pop('name') # can't pass this to PATCH
-                state['PATCH'].setdefault(guild_id, {})[name] \
-                    = {'json': cmd_dict, 'id': int(done[name]['id']),
-                       'cmd': todo[name]}
-        for name in to_delete:
-            state['DELETE'].setdefault(guild_id, {})[name] \
-                = {'id': int(done[name]['id'])}
-
-    async def process_command(self, name, guild_id, route, kwargs):
-        cmd = kwargs.pop('cmd', None)
+            self._index_slash(cmd)
+        # every scope has its own endpoint and rate limit bucket,
+        # so they can be registered at once - but not too many at a time,
+        # or they'll just end up queueing behind the global rate limit
+        sem = asyncio.Semaphore(5)
+        try:
+            await _gather(*(
+                self._register_scope(
+                    sem, global_path if guild_id is None
+                    else guild_path.format(guild_id),
+                    guild_id, guild)
+                for guild_id, guild in guilds.items()
+            ))
+        finally:
+            if app_info is not None:
+                # optional, so failing must not stop startup
+                try:
+                    await app_info
+                except Exception:
+                    logger.exception('Fetching application info failed')
+
+    async def _register_scope(self, sem, path, guild_id, guild):
+        # bulk overwrite: the API creates, updates and deletes
+        # commands as needed to match this list
+        route = _Route('PUT', path)
         try:
-            data = await self.http.request(route, **kwargs)
+            async with sem:
+                data = await self.http.request(
+                    route, json=[cmd.to_dict() for cmd in guild.values()])
         except discord.HTTPException:
-            logger.exception('Error when processing command %s:', name)
+            logger.exception(
+                'Error when registering commands in guild %s:', guild_id)
             return
         finally:
-            logger.debug('%s\t%s\tin guild\t%s', route.method, name, guild_id)
-        if cmd is not None:
-            cmd.id = int(data['id'])
+            logger.debug('PUT\t%s\tin guild\t%s', ', '.join(guild), guild_id)
+        for cmd_data in data:
+            cmd = guild[cmd_data['name']]
+            cmd.id = int(cmd_data['id'])
+            self._slash_by_id[cmd.id] = cmd
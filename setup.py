@@ -38,5 +38,9 @@ setup(
     keywords='discord slash commands',
     packages=["discord.ext.slash"],
     install_requires=requirements,
+    extras_require={
+        # faster serialization of request payloads
+        'orjson': ['orjson'],
+    },
     python_requires='>=3.7',
 )